@@ -5,22 +5,31 @@ FastAPI Web 应用
 import os
 import uuid
 import asyncio
+import hashlib
+from dataclasses import dataclass
 from typing import Optional
 from pathlib import Path
 import aiofiles
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+import aiofiles.os
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from paper_whisperer.config import settings
+from paper_whisperer.logging_config import setup_logging
+from paper_whisperer.middleware import ContentSizeLimitMiddleware
+from paper_whisperer.task_store import TaskStore
 from paper_whisperer.pdf_processor import PDFProcessor
 from paper_whisperer.paper_analyzer import PaperAnalyzer
 from paper_whisperer.content_generator import ContentGenerator
 from paper_whisperer.image_generator import ImageGenerator
 
 
+# 初始化日志（写入走后台线程，不阻塞事件循环）
+setup_logging()
+
 # 创建 FastAPI 应用
 app = FastAPI(title="Paper Whisperer", description="论文深度解读 Agent")
 
@@ -33,6 +42,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 声明了 Content-Length 的超大请求在读取请求体前直接拒绝；
+# 分块传输的请求仍由上传处理中的流式字节计数兜底
+app.add_middleware(ContentSizeLimitMiddleware, max_content_size=settings.MAX_FILE_SIZE)
+
 # 创建必要的目录
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
@@ -43,8 +56,12 @@ static_dir = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(static_dir):
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
-# 任务状态存储（生产环境应使用 Redis 或数据库）
-tasks = {}
+# 任务状态存储（配置 REDIS_URL 后使用 Redis，可跨 worker 共享）
+task_store = TaskStore()
+
+# 并发上限：避免请求量上涨时 LLM 调用和浏览器截图无界扩散
+LLM_SEM = asyncio.Semaphore(settings.LLM_CONCURRENCY)
+BROWSER_SEM = asyncio.Semaphore(settings.BROWSER_CONCURRENCY)
 
 
 # 数据模型
@@ -73,11 +90,94 @@ def generate_task_id() -> str:
     return str(uuid.uuid4())
 
 
-async def save_upload_file(file: UploadFile, file_path: str):
-    """保存上传的文件"""
+@dataclass(frozen=True, slots=True)
+class TaskPaths:
+    """单个任务的全部文件路径，集中计算一次，各处复用"""
+    pdf: str
+    article: str
+    note: str
+    image: str
+    temp_dir: str
+
+    @classmethod
+    def for_task(cls, task_id: str) -> "TaskPaths":
+        """根据任务 ID 构造各文件路径"""
+        return cls(
+            pdf=os.path.join(settings.UPLOAD_DIR, f"{task_id}.pdf"),
+            article=os.path.join(settings.OUTPUT_DIR, f"{task_id}_article.md"),
+            note=os.path.join(settings.OUTPUT_DIR, f"{task_id}_note.md"),
+            image=os.path.join(settings.OUTPUT_DIR, f"{task_id}_note.png"),
+            temp_dir=os.path.join(settings.TEMP_DIR, task_id)
+        )
+
+
+# 上传流式写入的块大小（1 MiB）
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+async def save_upload_file(file: UploadFile, file_path: str) -> tuple:
+    """
+    流式保存上传的文件，边读边写，避免整个文件驻留内存，
+    同时计算内容哈希用于分析结果去重
+
+    Args:
+        file: 上传的文件
+        file_path: 保存路径
+
+    Returns:
+        (写入的字节数, 内容哈希)
+
+    Raises:
+        HTTPException: 文件超过大小限制
+    """
+    total = 0
+    hasher = hashlib.blake2b(digest_size=32)
     async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > settings.MAX_FILE_SIZE:
+                # 超限立即中止，删除已写入的部分文件
+                os.remove(file_path)
+                raise HTTPException(status_code=400, detail="文件过大")
+            hasher.update(chunk)
+            await f.write(chunk)
+    return total, hasher.hexdigest()
+
+
+async def _run_limited(sem: asyncio.Semaphore, func, *args):
+    """在信号量约束下将同步调用放入线程池执行"""
+    async with sem:
+        return await asyncio.to_thread(func, *args)
+
+
+def _stream_to_file(make_stream, analysis_result, path: str, error_prefix: str) -> str:
+    """
+    流式消费 LLM 输出并边到边写盘，避免整段文本先在内存中成型
+
+    Args:
+        make_stream: 返回增量片段迭代器的生成函数
+        analysis_result: 论文分析结果
+        path: 输出文件路径
+        error_prefix: 出错时写入的提示前缀
+
+    Returns:
+        完整文本内容
+    """
+    pieces = []
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            for delta in make_stream(analysis_result):
+                pieces.append(delta)
+                f.write(delta)
+    except Exception as e:
+        text = f"{error_prefix}: {str(e)}"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return text
+    return "".join(pieces)
 
 
 async def process_paper_task(
@@ -101,34 +201,48 @@ async def process_paper_task(
         generate_note: 是否生成小红书笔记
         generate_image: 是否生成图片
     """
+    paths = TaskPaths.for_task(task_id)
+
     try:
         # 更新任务状态
-        tasks[task_id] = {
-            "status": "processing",
-            "progress": 0,
-            "message": "开始处理论文...",
-            "result": None
-        }
+        await task_store.update(
+            task_id,
+            status="processing",
+            progress=0,
+            message="开始处理论文...",
+            result=None
+        )
         
         # 初始化处理器
         analyzer = PaperAnalyzer()
         content_generator = ContentGenerator()
         image_generator = ImageGenerator()
         
-        # 分析论文
-        tasks[task_id]["progress"] = 10
-        tasks[task_id]["message"] = "正在分析论文..."
-        
-        output_dir = os.path.join(settings.TEMP_DIR, task_id)
-        analysis_result = analyzer.analyze_paper(
-            pdf_path=pdf_path,
-            output_dir=output_dir,
-            translate=translate,
-            target_lang=target_lang
-        )
+        # 分析论文（命中内容哈希缓存时跳过整个 PDF→LLM 分析阶段）
+        await task_store.update(task_id, progress=10, message="正在分析论文...")
+
+        task_info = await task_store.get(task_id)
+        digest = (task_info or {}).get("digest")
+
+        analysis_result = None
+        if digest:
+            analysis_result = await task_store.get_cached_analysis(
+                digest, translate, target_lang
+            )
+
+        if analysis_result is None:
+            analysis_result = await analyzer.analyze_paper(
+                pdf_path=pdf_path,
+                output_dir=paths.temp_dir,
+                translate=translate,
+                target_lang=target_lang
+            )
+            if digest:
+                await task_store.set_cached_analysis(
+                    digest, translate, target_lang, analysis_result
+                )
         
-        tasks[task_id]["progress"] = 60
-        tasks[task_id]["message"] = "正在生成内容..."
+        await task_store.update(task_id, progress=60, message="正在生成内容...")
         
         result = {
             "analysis": analysis_result,
@@ -137,49 +251,86 @@ async def process_paper_task(
             "image_path": None
         }
         
-        # 生成公众号文章
+        # 图片生成依赖结构化笔记，先生成一次供复用，避免重复 LLM 调用
+        structured_note = None
+        if generate_image:
+            structured_note = await _run_limited(
+                LLM_SEM,
+                content_generator.generate_xiaohongshu_note_structured,
+                analysis_result
+            )
+
+        # 三个生成阶段相互独立，放入线程池并发执行，
+        # 总耗时从三者之和降为三者最大值
+        stages = []
         if generate_article:
-            article = content_generator.generate_wechat_article(analysis_result)
-            result["article"] = article
-            
-            # 保存文章
-            article_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_article.md")
-            async with aiofiles.open(article_path, 'w', encoding='utf-8') as f:
-                await f.write(article)
-            result["article_path"] = article_path
-        
-        tasks[task_id]["progress"] = 80
-        tasks[task_id]["message"] = "正在生成小红书笔记..."
-        
-        # 生成小红书笔记
+            stages.append((
+                "article",
+                _run_limited(
+                    LLM_SEM,
+                    _stream_to_file,
+                    content_generator.generate_wechat_article_stream,
+                    analysis_result,
+                    paths.article,
+                    "生成文章时出错"
+                )
+            ))
         if generate_note:
-            note = content_generator.generate_xiaohongshu_note(analysis_result)
-            result["note"] = note
-            
-            # 保存笔记
-            note_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_note.md")
-            async with aiofiles.open(note_path, 'w', encoding='utf-8') as f:
-                await f.write(note)
-            result["note_path"] = note_path
-        
-        # 生成小红书图片
+            stages.append((
+                "note",
+                _run_limited(
+                    LLM_SEM,
+                    _stream_to_file,
+                    content_generator.generate_xiaohongshu_note_stream,
+                    analysis_result,
+                    paths.note,
+                    "生成笔记时出错"
+                )
+            ))
         if generate_image:
-            image_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_note.png")
-            image_generator.generate_xiaohongshu_image(
-                analysis_result=analysis_result,
-                output_path=image_path
-            )
-            result["image_path"] = image_path
-        
-        tasks[task_id]["progress"] = 100
-        tasks[task_id]["status"] = "completed"
-        tasks[task_id]["message"] = "处理完成"
-        tasks[task_id]["result"] = result
-        
+            stages.append((
+                "image",
+                _run_limited(
+                    BROWSER_SEM,
+                    image_generator.generate_xiaohongshu_image,
+                    analysis_result,
+                    paths.image,
+                    structured_note
+                )
+            ))
+
+        outputs = {}
+        if stages:
+            stage_results = await asyncio.gather(*(coro for _, coro in stages))
+            outputs = dict(zip((name for name, _ in stages), stage_results))
+
+        # 文章和笔记已在流式生成时落盘，这里只回填结果
+        if generate_article:
+            result["article"] = outputs["article"]
+            result["article_path"] = paths.article
+
+        if generate_note:
+            result["note"] = outputs["note"]
+            result["note_path"] = paths.note
+
+        if generate_image:
+            result["image_path"] = paths.image
+
+        await task_store.update(
+            task_id,
+            status="completed",
+            progress=100,
+            message="处理完成",
+            result=result
+        )
+
     except Exception as e:
-        tasks[task_id]["status"] = "failed"
-        tasks[task_id]["message"] = f"处理失败: {str(e)}"
-        tasks[task_id]["result"] = None
+        await task_store.update(
+            task_id,
+            status="failed",
+            message=f"处理失败: {str(e)}",
+            result=None
+        )
 
 
 # API 路由
@@ -210,40 +361,97 @@ async def upload_file(file: UploadFile = File(...)):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="只支持 PDF 文件")
     
-    # 检查文件大小
-    content = await file.read()
-    if len(content) > settings.MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="文件过大")
-    
     # 生成任务 ID
     task_id = generate_task_id()
-    
-    # 保存文件
-    file_path = os.path.join(settings.UPLOAD_DIR, f"{task_id}.pdf")
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
-    
-    # 检查页数
+
+    # 流式保存文件，超过大小限制时立即中止
+    file_path = TaskPaths.for_task(task_id).pdf
+    file_size, digest = await save_upload_file(file, file_path)
+
+    # 检查页数（同步解析放到线程池，避免阻塞事件循环）
     processor = PDFProcessor()
-    num_pages = processor.get_page_count(file_path)
+    num_pages = await asyncio.to_thread(processor.get_page_count, file_path)
     if num_pages > settings.MAX_PAGES:
         raise HTTPException(
             status_code=400,
             detail=f"页数过多（{num_pages}页），最大支持{settings.MAX_PAGES}页"
         )
     
-    # 初始化任务状态
-    tasks[task_id] = {
-        "status": "pending",
-        "progress": 0,
-        "message": "文件上传成功，等待处理",
-        "result": None
-    }
+    # 初始化任务状态（记录内容哈希，供分析缓存去重）
+    await task_store.update(
+        task_id,
+        status="pending",
+        progress=0,
+        message="文件上传成功，等待处理",
+        result=None,
+        digest=digest
+    )
     
     return {
         "task_id": task_id,
         "filename": file.filename,
-        "file_size": len(content),
+        "file_size": file_size,
+        "num_pages": num_pages
+    }
+
+
+@app.post("/upload_stream")
+async def upload_stream(request: Request):
+    """
+    上传 PDF 文件（原始流式接口）
+
+    直接消费请求体字节流，绕过 multipart 解析的整体缓冲，
+    从第一个分块到达即开始写盘。文件名通过 X-Filename 请求头传递。
+
+    Returns:
+        任务 ID
+    """
+    filename = request.headers.get("x-filename", "upload.pdf")
+
+    # 检查文件类型
+    if not filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="只支持 PDF 文件")
+
+    # 生成任务 ID
+    task_id = generate_task_id()
+
+    # 流式写盘，超过大小限制时立即中止
+    file_path = TaskPaths.for_task(task_id).pdf
+    total = 0
+    hasher = hashlib.blake2b(digest_size=32)
+    async with aiofiles.open(file_path, 'wb') as f:
+        async for chunk in request.stream():
+            total += len(chunk)
+            if total > settings.MAX_FILE_SIZE:
+                os.remove(file_path)
+                raise HTTPException(status_code=400, detail="文件过大")
+            hasher.update(chunk)
+            await f.write(chunk)
+    digest = hasher.hexdigest()
+
+    # 检查页数（同步解析放到线程池，避免阻塞事件循环）
+    processor = PDFProcessor()
+    num_pages = await asyncio.to_thread(processor.get_page_count, file_path)
+    if num_pages > settings.MAX_PAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"页数过多（{num_pages}页），最大支持{settings.MAX_PAGES}页"
+        )
+
+    # 初始化任务状态（记录内容哈希，供分析缓存去重）
+    await task_store.update(
+        task_id,
+        status="pending",
+        progress=0,
+        message="文件上传成功，等待处理",
+        result=None,
+        digest=digest
+    )
+
+    return {
+        "task_id": task_id,
+        "filename": filename,
+        "file_size": total,
         "num_pages": num_pages
     }
 
@@ -264,26 +472,38 @@ async def analyze_paper(
         任务状态
     """
     task_id = request.task_id
-    
-    if task_id not in tasks:
+
+    if not await task_store.exists(task_id):
         raise HTTPException(status_code=404, detail="任务不存在")
     
     # 检查文件是否存在
-    pdf_path = os.path.join(settings.UPLOAD_DIR, f"{task_id}.pdf")
+    pdf_path = TaskPaths.for_task(task_id).pdf
     if not os.path.exists(pdf_path):
         raise HTTPException(status_code=404, detail="PDF 文件不存在")
     
-    # 添加后台任务
-    background_tasks.add_task(
-        process_paper_task,
-        task_id=task_id,
-        pdf_path=pdf_path,
-        translate=request.translate,
-        target_lang=request.target_lang,
-        generate_article=request.generate_article,
-        generate_note=request.generate_note,
-        generate_image=request.generate_image
-    )
+    # 配置了 Redis 时投递到 worker 队列（见 worker.py），
+    # 否则回退到进程内后台任务
+    if task_store.has_redis:
+        await task_store.push_job({
+            "task_id": task_id,
+            "pdf_path": pdf_path,
+            "translate": request.translate,
+            "target_lang": request.target_lang,
+            "generate_article": request.generate_article,
+            "generate_note": request.generate_note,
+            "generate_image": request.generate_image
+        })
+    else:
+        background_tasks.add_task(
+            process_paper_task,
+            task_id=task_id,
+            pdf_path=pdf_path,
+            translate=request.translate,
+            target_lang=request.target_lang,
+            generate_article=request.generate_article,
+            generate_note=request.generate_note,
+            generate_image=request.generate_image
+        )
     
     return {
         "task_id": task_id,
@@ -302,10 +522,10 @@ async def get_task_status(task_id: str):
     Returns:
         任务状态
     """
-    if task_id not in tasks:
+    task_info = await task_store.get(task_id)
+    if task_info is None:
         raise HTTPException(status_code=404, detail="任务不存在")
-    
-    task_info = tasks[task_id]
+
     return TaskStatus(
         task_id=task_id,
         status=task_info["status"],
@@ -326,11 +546,10 @@ async def get_task_result(task_id: str):
     Returns:
         任务结果
     """
-    if task_id not in tasks:
+    task_info = await task_store.get(task_id)
+    if task_info is None:
         raise HTTPException(status_code=404, detail="任务不存在")
-    
-    task_info = tasks[task_id]
-    
+
     if task_info["status"] != "completed":
         raise HTTPException(status_code=400, detail="任务尚未完成")
     
@@ -348,15 +567,19 @@ async def download_article(task_id: str):
     Returns:
         文件响应
     """
-    if task_id not in tasks:
+    if not await task_store.exists(task_id):
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    article_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_article.md")
-    if not os.path.exists(article_path):
+    article_path = TaskPaths.for_task(task_id).article
+    try:
+        stat = await aiofiles.os.stat(article_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="文章文件不存在")
-    
+
+    # 传入 stat_result 可省去 Starlette 内部的同步 stat，并走 sendfile 零拷贝路径
     return FileResponse(
         article_path,
+        stat_result=stat,
         filename=f"article_{task_id}.md",
         media_type="text/markdown"
     )
@@ -373,15 +596,18 @@ async def download_note(task_id: str):
     Returns:
         文件响应
     """
-    if task_id not in tasks:
+    if not await task_store.exists(task_id):
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    note_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_note.md")
-    if not os.path.exists(note_path):
+    note_path = TaskPaths.for_task(task_id).note
+    try:
+        stat = await aiofiles.os.stat(note_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="笔记文件不存在")
-    
+
     return FileResponse(
         note_path,
+        stat_result=stat,
         filename=f"note_{task_id}.md",
         media_type="text/markdown"
     )
@@ -398,15 +624,18 @@ async def download_image(task_id: str):
     Returns:
         文件响应
     """
-    if task_id not in tasks:
+    if not await task_store.exists(task_id):
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    image_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_note.png")
-    if not os.path.exists(image_path):
+    image_path = TaskPaths.for_task(task_id).image
+    try:
+        stat = await aiofiles.os.stat(image_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="图片文件不存在")
-    
+
     return FileResponse(
         image_path,
+        stat_result=stat,
         filename=f"note_{task_id}.png",
         media_type="image/png"
     )
@@ -414,5 +643,15 @@ async def download_image(task_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8020)
+    # 多 worker 模式下任务状态必须共享：未配置 REDIS_URL 时每个 worker
+    # 只有自己的内存状态，跨 worker 查询会 404，因此退回单 worker
+    uvicorn.run(
+        "paper_whisperer.app:app",
+        host="0.0.0.0",
+        port=8020,
+        workers=os.cpu_count() if settings.REDIS_URL else 1,
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=75  # 大文件上传期间保持连接
+    )
 
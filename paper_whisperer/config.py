@@ -2,6 +2,7 @@
 配置管理模块
 """
 import os
+from functools import lru_cache
 from typing import Optional
 try:
     from pydantic_settings import BaseSettings
@@ -24,15 +25,29 @@ class Settings(BaseSettings):
     DEFAULT_VISION_MODEL: str = "gpt-4o"  # 多模态模型
     QWEN_MODEL: str = "qwen-vl-max"  # Qwen 多模态模型
     
+    # 任务状态存储配置（配置 REDIS_URL 后任务状态存入 Redis，支持多 worker）
+    REDIS_URL: Optional[str] = None
+    TASK_TTL: int = 7 * 24 * 3600  # 任务状态保留时间（秒）
+    ANALYSIS_CACHE_TTL: int = 7 * 24 * 3600  # 内容哈希分析缓存保留时间（秒）
+
     # 文件路径配置
     UPLOAD_DIR: str = "uploads"
     OUTPUT_DIR: str = "outputs"
     TEMP_DIR: str = "temp"
+    CACHE_DIR: str = "cache"  # LLM 响应磁盘缓存目录
     
     # 处理配置
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
     MAX_PAGES: int = 100  # 最大页数
     CHUNK_SIZE: int = 5  # 每次处理的页数
+
+    # LLM 输入预算
+    MAX_PAGE_TOKENS: int = 2000  # 单页文本送入模型前的 token 截断上限
+
+    # 并发配置
+    MAX_CONCURRENT_REQUESTS: int = 8  # 逐页分析/翻译的并发 LLM 请求数上限
+    LLM_CONCURRENCY: int = 8  # 同时进行的 LLM 调用数上限
+    BROWSER_CONCURRENCY: int = 2  # 同时进行的浏览器截图数上限
     
     # 图片生成配置
     XIAOHONGSHU_WIDTH: int = 1080
@@ -43,6 +58,12 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
 
 
-# 全局配置实例
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """获取配置单例（缓存结果，避免重复解析环境变量和 .env 文件）"""
+    return Settings()
+
+
+# 全局配置实例（兼容旧用法，新代码建议通过 get_settings() 获取）
+settings = get_settings()
 
@@ -4,38 +4,67 @@ HTML+CSS 模板渲染为小红书风格笔记图片
 """
 import os
 import base64
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional
 from jinja2 import Template
-from html2image import Html2Image
 from paper_whisperer.config import settings
 from paper_whisperer.content_generator import ContentGenerator
 
 
+logger = logging.getLogger(__name__)
+
+# 进程级共享的 Playwright 浏览器，
+# 避免每次生成图片都冷启动一个 Chromium（约 1-2 秒）。
+# sync API 基于 greenlet，绑定创建它的线程，跨线程调用会报
+# "cannot switch to a different thread"——启动和所有浏览器操作
+# 都固定在这个单线程执行器里进行（同时天然串行化了截图）
+_PLAYWRIGHT = None
+_BROWSER = None
+_BROWSER_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="playwright")
+
+
+@functools.lru_cache(maxsize=4)
+def _load_template(template_path: str) -> Template:
+    """读取并编译 HTML 模板（按路径缓存编译结果）"""
+    with open(template_path, "r", encoding="utf-8") as f:
+        return Template(f.read())
+
+
+def _get_browser():
+    """获取共享的 Playwright 浏览器实例（首次调用时启动，仅在专属线程内调用）"""
+    global _PLAYWRIGHT, _BROWSER
+    if _BROWSER is None:
+        from playwright.sync_api import sync_playwright
+        _PLAYWRIGHT = sync_playwright().start()
+        _BROWSER = _PLAYWRIGHT.chromium.launch()
+    return _BROWSER
+
+
 class ImageGenerator:
     """图片生成器"""
-    
+
     def __init__(self):
         """初始化图片生成器"""
-        self.hti = Html2Image()
         self.width = settings.XIAOHONGSHU_WIDTH
         self.height = settings.XIAOHONGSHU_HEIGHT
         self.content_generator = ContentGenerator()
     
-    def load_template(self) -> str:
+    def load_template(self) -> Template:
         """
-        加载 HTML 模板
-        
+        加载 HTML 模板（编译结果进程内缓存）
+
         Returns:
-            模板内容
+            编译后的 Jinja 模板
         """
         template_path = os.path.join(
             os.path.dirname(__file__),
             "templates",
             "xiaohongshu.html"
         )
-        
-        with open(template_path, "r", encoding="utf-8") as f:
-            return f.read()
+
+        return _load_template(template_path)
     
     def generate_xiaohongshu_image(
         self,
@@ -60,9 +89,8 @@ class ImageGenerator:
                 analysis_result
             )
         
-        # 加载模板
-        template_content = self.load_template()
-        template = Template(template_content)
+        # 加载模板（已缓存编译结果）
+        template = self.load_template()
         
         # 渲染 HTML
         html_content = template.render(
@@ -76,32 +104,12 @@ class ImageGenerator:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # 生成图片
+        # 生成图片（常驻浏览器直接写入目标路径，无临时文件）
         try:
-            # 使用 html2image 生成图片
-            # html2image 需要保存到当前目录，然后再移动
-            temp_filename = os.path.basename(output_path)
-            self.hti.screenshot(
-                html_str=html_content,
-                save_as=temp_filename,
-                size=(self.width, self.height)
-            )
-            
-            # 移动文件到目标位置
-            temp_path = temp_filename
-            if os.path.exists(temp_path) and temp_path != output_path:
-                import shutil
-                shutil.move(temp_path, output_path)
-            
-            return output_path
+            return self._generate_with_playwright(html_content, output_path)
         except Exception as e:
-            print(f"使用 html2image 生成图片时出错: {e}")
-            # 如果 html2image 失败，尝试使用 playwright
-            try:
-                return self._generate_with_playwright(html_content, output_path)
-            except Exception as e2:
-                print(f"使用 Playwright 生成图片时也出错: {e2}")
-                raise Exception(f"图片生成失败: {e}, {e2}")
+            logger.exception("使用 Playwright 生成图片时出错")
+            raise Exception(f"图片生成失败: {e}")
     
     def _generate_with_playwright(
         self,
@@ -109,7 +117,7 @@ class ImageGenerator:
         output_path: str
     ) -> str:
         """
-        使用 Playwright 生成图片（备用方案）
+        使用 Playwright 生成图片
         
         Args:
             html_content: HTML 内容
@@ -118,26 +126,28 @@ class ImageGenerator:
         Returns:
             生成的图片文件路径
         """
-        try:
-            from playwright.sync_api import sync_playwright
-            
-            with sync_playwright() as p:
-                browser = p.chromium.launch()
-                page = browser.new_page(
-                    viewport={"width": self.width, "height": self.height}
-                )
-                
+        def _screenshot() -> str:
+            # 复用常驻浏览器，只为本次截图创建新页面；
+            # 始终运行在专属线程上，与浏览器的创建线程一致
+            browser = _get_browser()
+            page = browser.new_page(
+                viewport={"width": self.width, "height": self.height}
+            )
+            try:
                 # 将 HTML 内容写入页面
                 page.set_content(html_content)
-                
+
                 # 截图
                 page.screenshot(path=output_path, full_page=True)
-                
-                browser.close()
-            
+            finally:
+                page.close()
+
             return output_path
-        except Exception as e:
-            print(f"使用 Playwright 生成图片时出错: {e}")
+
+        try:
+            return _BROWSER_EXECUTOR.submit(_screenshot).result()
+        except Exception:
+            logger.exception("使用 Playwright 生成图片时出错")
             raise
     
     def generate_custom_image(
@@ -160,35 +170,17 @@ class ImageGenerator:
             生成的图片文件路径
         """
         if template_path and os.path.exists(template_path):
-            with open(template_path, "r", encoding="utf-8") as f:
-                template_content = f.read()
+            template = _load_template(template_path)
         else:
-            template_content = self.load_template()
-        
-        template = Template(template_content)
+            template = self.load_template()
+
         html_content = template.render(title=title, **content)
         
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         try:
-            temp_filename = os.path.basename(output_path)
-            self.hti.screenshot(
-                html_str=html_content,
-                save_as=temp_filename,
-                size=(self.width, self.height)
-            )
-            
-            temp_path = temp_filename
-            if os.path.exists(temp_path) and temp_path != output_path:
-                import shutil
-                shutil.move(temp_path, output_path)
-            
-            return output_path
+            return self._generate_with_playwright(html_content, output_path)
         except Exception as e:
-            print(f"生成自定义图片时出错: {e}")
-            try:
-                return self._generate_with_playwright(html_content, output_path)
-            except Exception as e2:
-                print(f"使用 Playwright 生成图片时也出错: {e2}")
-                raise Exception(f"图片生成失败: {e}, {e2}")
+            logger.exception("生成自定义图片时出错")
+            raise Exception(f"图片生成失败: {e}")
 
@@ -2,15 +2,205 @@
 LLM 客户端模块
 支持 OpenAI 兼容接口（302.ai）和 Qwen 接口
 """
+import asyncio
 import base64
+import functools
+import hashlib
+import json
 import os
 from typing import List, Dict, Optional, Union
-from openai import OpenAI
-import dashscope
-from dashscope import MultiModalConversation
+import aiofiles
+import httpx
+try:
+    # SIMD 加速的 base64 实现，较 stdlib 快 5-20 倍
+    import pybase64
+except ImportError:
+    pybase64 = None
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+try:
+    # LLM 响应磁盘缓存，未安装时自动禁用
+    import diskcache
+except ImportError:
+    diskcache = None
+from openai import OpenAI, AsyncOpenAI
 from paper_whisperer.config import settings
 
 
+# 进程级共享的 HTTP 连接池：复用 keep-alive 连接，
+# 避免每次请求都重新进行 TCP+TLS 握手
+_POOL_LIMITS = dict(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60)
+
+# 页面分析默认提示词（模块级常量，避免每次调用重建字符串）
+DEFAULT_PAGE_PROMPT = """请分析这页论文内容，提取以下信息：
+1. 主要内容概述
+2. 关键概念和技术
+3. 重要数据和结果
+4. 与其他部分的关联
+
+请用中文回答，语言要专业但易懂。"""
+
+_http_client = None
+_async_http_client = None
+_encoder = None
+_response_cache = None
+_dashscope = None
+
+
+def _get_dashscope():
+    """延迟导入 dashscope（仅 qwen 提供商需要，导入耗时数百毫秒且常驻几十 MB）"""
+    global _dashscope
+    if _dashscope is None:
+        import dashscope
+        _dashscope = dashscope
+    return _dashscope
+
+
+def _get_response_cache():
+    """获取进程级共享的 LLM 响应磁盘缓存（diskcache 未安装时禁用）"""
+    global _response_cache
+    if diskcache is None:
+        return None
+    if _response_cache is None:
+        _response_cache = diskcache.Cache(settings.CACHE_DIR, size_limit=2 << 30)
+    return _response_cache
+
+
+def _response_cache_key(
+    provider, model, temperature, max_tokens, messages, image_parts=()
+) -> str:
+    """
+    按请求内容生成精确缓存键
+
+    相同的消息、模型和图片内容命中同一个键，重跑时直接取缓存，
+    完全省掉网络往返
+
+    Args:
+        provider: 提供商
+        model: 模型名称
+        temperature: 温度参数
+        max_tokens: 最大 token 数
+        messages: 消息列表
+        image_parts: 图片标识（路径+修改时间，或 base64 内容）
+
+    Returns:
+        十六进制缓存键
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(
+        [provider, model, temperature, max_tokens, messages],
+        sort_keys=True, ensure_ascii=False
+    ).encode())
+    for part in image_parts:
+        h.update(part.encode())
+    return h.hexdigest()
+
+
+def _image_cache_parts(image_paths, image_urls=None, pre_encoded_images=None):
+    """把图片输入折算成缓存键片段（路径按 mtime+大小标识，免去读盘哈希）"""
+    parts = []
+    for image_path in image_paths or []:
+        if os.path.exists(image_path):
+            stat = os.stat(image_path)
+            parts.append(f"{image_path}:{stat.st_mtime}:{stat.st_size}")
+    parts.extend(image_urls or [])
+    parts.extend(pre_encoded_images or [])
+    return parts
+
+
+def _truncate_to_token_budget(text: str, max_tokens: int) -> str:
+    """
+    将文本截断到 token 预算内
+
+    页面文本会原样进入提示词，计费和服务端延迟都随输入 token 数
+    线性增长，发送前按 MAX_PAGE_TOKENS 截断
+
+    Args:
+        text: 原始文本
+        max_tokens: token 预算
+
+    Returns:
+        截断后的文本
+    """
+    global _encoder
+    if tiktoken is not None:
+        if _encoder is None:
+            try:
+                _encoder = tiktoken.encoding_for_model("gpt-4o")
+            except Exception:
+                _encoder = tiktoken.get_encoding("cl100k_base")
+        tokens = _encoder.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return _encoder.decode(tokens[:max_tokens])
+
+    # 无 tiktoken 时按字符数粗略截断（中英混排大致 1-2 字符一个 token）
+    return text[:max_tokens * 2]
+
+
+def _b64encode(data: bytes) -> str:
+    """base64 编码，优先使用 pybase64 的 SIMD 实现"""
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode('utf-8')
+
+
+async def _encode_images_async(image_paths: List[str]) -> List[str]:
+    """
+    并发读取并 base64 编码多张图片
+
+    多页图片的读盘通过 aiofiles 一次性批量提交给事件循环，
+    而不是逐张阻塞 read()
+
+    Args:
+        image_paths: 图片文件路径列表
+
+    Returns:
+        base64 编码结果列表（与输入同序）
+    """
+    async def _one(image_path: str) -> str:
+        async with aiofiles.open(image_path, "rb") as f:
+            data = await f.read()
+        return _b64encode(data)
+
+    return list(await asyncio.gather(*(_one(p) for p in image_paths)))
+
+
+@functools.lru_cache(maxsize=256)
+def _encode_image_cached(image_path: str, mtime: float) -> str:
+    """读取并 base64 编码图片，按 (路径, 修改时间) 缓存，重复页零成本"""
+    with open(image_path, "rb") as image_file:
+        return _b64encode(image_file.read())
+
+
+def _get_http_client() -> httpx.Client:
+    """获取共享的同步 HTTP 客户端"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            limits=httpx.Limits(**_POOL_LIMITS),
+            # 读超时对齐 SDK 默认的 600s：长生成（整页视觉分析、批量翻译）
+            # 在 60s 下会被误杀
+            timeout=httpx.Timeout(600.0, connect=5.0)
+        )
+    return _http_client
+
+
+def _get_async_http_client() -> httpx.AsyncClient:
+    """获取共享的异步 HTTP 客户端"""
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(**_POOL_LIMITS),
+            # 读超时对齐 SDK 默认的 600s：长生成（整页视觉分析、批量翻译）
+            # 在 60s 下会被误杀
+            timeout=httpx.Timeout(600.0, connect=5.0)
+        )
+    return _async_http_client
+
+
 class LLMClient:
     """统一的 LLM 客户端，支持多个 API 接口"""
     
@@ -38,31 +228,76 @@ class LLMClient:
             if settings.OPENAI_BASE_URL:
                 init_kwargs["base_url"] = settings.OPENAI_BASE_URL
             
-            self.client = OpenAI(**init_kwargs)
+            self.client = OpenAI(http_client=_get_http_client(), **init_kwargs)
+            self.async_client = AsyncOpenAI(http_client=_get_async_http_client(), **init_kwargs)
             self.model = settings.DEFAULT_VISION_MODEL
         elif provider == "qwen":
             if not settings.QWEN_API_KEY:
                 raise ValueError(
                     "QWEN_API_KEY 未设置。请在 .env 文件中设置 QWEN_API_KEY 环境变量。"
                 )
-            dashscope.api_key = settings.QWEN_API_KEY
+            _get_dashscope().api_key = settings.QWEN_API_KEY
             self.model = settings.QWEN_MODEL
         else:
             raise ValueError(f"不支持的提供商: {provider}")
     
     def encode_image(self, image_path: str) -> str:
         """
-        将图片编码为 base64
-        
+        将图片编码为 base64（结果按文件路径和修改时间缓存）
+
         Args:
             image_path: 图片文件路径
-            
+
         Returns:
             base64 编码的图片字符串
         """
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+        return _encode_image_cached(image_path, os.path.getmtime(image_path))
     
+    def upload_images(self, image_paths: List[str]) -> Dict[str, str]:
+        """
+        将图片经 Files API 上传一次，后续请求按 file_id 引用，
+        免去每次请求内联 base64（payload 膨胀 33%）
+
+        已上传的 file_id 记录在图片目录的 JSON sidecar 中，
+        重复运行跳过上传。仅 openai 提供商支持。
+
+        Args:
+            image_paths: 图片文件路径列表
+
+        Returns:
+            图片路径到 file_id 的映射
+        """
+        if self.provider != "openai":
+            raise ValueError("仅 openai 提供商支持 Files API 上传")
+
+        file_ids: Dict[str, str] = {}
+        if not image_paths:
+            return file_ids
+
+        # sidecar 缓存与图片同目录
+        sidecar_path = os.path.join(os.path.dirname(image_paths[0]), ".file_ids.json")
+        if os.path.exists(sidecar_path):
+            try:
+                with open(sidecar_path, "r", encoding="utf-8") as f:
+                    file_ids = json.load(f)
+            except Exception:
+                file_ids = {}
+
+        changed = False
+        for image_path in image_paths:
+            if image_path in file_ids:
+                continue
+            with open(image_path, "rb") as f:
+                uploaded = self.client.files.create(file=f, purpose="vision")
+            file_ids[image_path] = uploaded.id
+            changed = True
+
+        if changed:
+            with open(sidecar_path, "w", encoding="utf-8") as f:
+                json.dump(file_ids, f, ensure_ascii=False, indent=2)
+
+        return file_ids
+
     def chat_completion(
         self,
         messages: List[Dict],
@@ -82,6 +317,16 @@ class LLMClient:
         Returns:
             模型回复内容
         """
+        cache = _get_response_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = _response_cache_key(
+                self.provider, model or self.model, temperature, max_tokens, messages
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         if self.provider == "openai":
             response = self.client.chat.completions.create(
                 model=model or self.model,
@@ -89,26 +334,68 @@ class LLMClient:
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
         elif self.provider == "qwen":
-            response = dashscope.Generation.call(
+            response = _get_dashscope().Generation.call(
                 model=model or self.model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens
             )
             if response.status_code == 200:
-                return response.output.choices[0].message.content
+                content = response.output.choices[0].message.content
             else:
                 raise Exception(f"Qwen API 错误: {response.message}")
+
+        if cache_key is not None:
+            cache.set(cache_key, content)
+        return content
     
+    def chat_completion_stream(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ):
+        """
+        流式文本对话完成，逐段产出模型回复
+
+        Args:
+            messages: 消息列表
+            model: 模型名称，None 使用默认模型
+            temperature: 温度参数
+            max_tokens: 最大 token 数
+
+        Yields:
+            模型回复的增量文本片段
+        """
+        if self.provider == "openai":
+            response = self.client.chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        elif self.provider == "qwen":
+            # dashscope 接口不走流式，退化为一次性产出完整回复
+            yield self.chat_completion(
+                messages, model=model, temperature=temperature, max_tokens=max_tokens
+            )
+
     def vision_completion(
         self,
         messages: List[Dict],
         image_paths: List[str],
         model: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        image_urls: Optional[List[str]] = None,
+        pre_encoded_images: Optional[List[str]] = None
     ) -> str:
         """
         多模态对话完成（支持图片）
@@ -119,53 +406,38 @@ class LLMClient:
             model: 模型名称，None 使用默认模型
             temperature: 温度参数
             max_tokens: 最大 token 数
+            image_urls: 远程图片 URL 列表（提供时跳过 base64 内联）
+            pre_encoded_images: 已编码好的 base64 图片列表（JPEG），跳过读盘和编码
             
         Returns:
             模型回复内容
         """
+        cache = _get_response_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = _response_cache_key(
+                self.provider, model or self.model, temperature, max_tokens, messages,
+                _image_cache_parts(image_paths, image_urls, pre_encoded_images)
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         if self.provider == "openai":
-            # OpenAI 兼容接口格式
-            formatted_messages = []
-            for msg in messages:
-                if isinstance(msg, dict):
-                    formatted_msg = {"role": msg.get("role", "user"), "content": []}
-                    
-                    # 处理文本内容
-                    text_content = None
-                    if "text" in msg:
-                        text_content = msg["text"]
-                    elif "content" in msg:
-                        if isinstance(msg["content"], str):
-                            text_content = msg["content"]
-                    
-                    if text_content:
-                        formatted_msg["content"].append({
-                            "type": "text",
-                            "text": text_content
-                        })
-                    
-                    # 添加图片
-                    for img_path in image_paths:
-                        if os.path.exists(img_path):
-                            base64_image = self.encode_image(img_path)
-                            formatted_msg["content"].append({
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{base64_image}"
-                                }
-                            })
-                    
-                    formatted_messages.append(formatted_msg)
-                else:
-                    formatted_messages.append(msg)
-            
+            formatted_messages = self._format_vision_messages(
+                messages, image_paths, image_urls, pre_encoded_images
+            )
+
             response = self.client.chat.completions.create(
                 model=model or self.model,
                 messages=formatted_messages,
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            if cache_key is not None:
+                cache.set(cache_key, content)
+            return content
         
         elif self.provider == "qwen":
             # Qwen 多模态接口格式
@@ -180,15 +452,20 @@ class LLMClient:
                         if isinstance(msg["content"], str):
                             contents.append({"text": msg["content"]})
             
-            # 添加图片
-            for img_path in image_paths:
-                with open(img_path, "rb") as f:
-                    image_data = base64.b64encode(f.read()).decode('utf-8')
+            # 添加图片（复用编码缓存）
+            if pre_encoded_images:
+                for image_data in pre_encoded_images:
+                    contents.append({
+                        "image": f"data:image/jpeg;base64,{image_data}"
+                    })
+            else:
+                for img_path in image_paths:
+                    image_data = self.encode_image(img_path)
                     contents.append({
                         "image": f"data:image/png;base64,{image_data}"
                     })
             
-            response = MultiModalConversation.call(
+            response = _get_dashscope().MultiModalConversation.call(
                 model=model or self.model,
                 messages=[{
                     "role": "user",
@@ -199,15 +476,240 @@ class LLMClient:
             )
             
             if response.status_code == 200:
-                return response.output.choices[0].message.content
+                content = response.output.choices[0].message.content
+                if cache_key is not None:
+                    cache.set(cache_key, content)
+                return content
             else:
                 raise Exception(f"Qwen API 错误: {response.message}")
     
+    def _format_vision_messages(
+        self,
+        messages: List[Dict],
+        image_paths: List[str],
+        image_urls: Optional[List[str]] = None,
+        pre_encoded_images: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        将消息与图片组装为 OpenAI 兼容的多模态消息格式
+
+        Args:
+            messages: 消息列表
+            image_paths: 图片文件路径列表
+            image_urls: 远程图片 URL 列表（提供时优先使用，跳过 base64 内联）
+            pre_encoded_images: 已编码好的 base64 图片列表（JPEG）
+
+        Returns:
+            格式化后的消息列表
+        """
+        if image_urls:
+            # 已有远程引用（Files API / 对象存储），不再内联 base64
+            image_url_values = list(image_urls)
+        elif pre_encoded_images:
+            # 内存中渲染好的 JPEG，免读盘
+            image_url_values = [
+                f"data:image/jpeg;base64,{image_data}"
+                for image_data in pre_encoded_images
+            ]
+        else:
+            # 图片只编码一次，N 条消息复用同一份编码结果
+            image_url_values = [
+                f"data:image/png;base64,{self.encode_image(img_path)}"
+                for img_path in image_paths
+                if os.path.exists(img_path)
+            ]
+
+        formatted_messages = []
+        for msg in messages:
+            if isinstance(msg, dict):
+                formatted_msg = {"role": msg.get("role", "user"), "content": []}
+
+                # 处理文本内容
+                text_content = None
+                if "text" in msg:
+                    text_content = msg["text"]
+                elif "content" in msg:
+                    if isinstance(msg["content"], str):
+                        text_content = msg["content"]
+
+                if text_content:
+                    formatted_msg["content"].append({
+                        "type": "text",
+                        "text": text_content
+                    })
+
+                # 添加图片
+                for url in image_url_values:
+                    formatted_msg["content"].append({
+                        "type": "image_url",
+                        "image_url": {
+                            "url": url
+                        }
+                    })
+
+                formatted_messages.append(formatted_msg)
+            else:
+                formatted_messages.append(msg)
+
+        return formatted_messages
+
+    async def chat_completion_async(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        chat_completion 的异步版本，供并发调用使用
+
+        Args:
+            messages: 消息列表
+            model: 模型名称，None 使用默认模型
+            temperature: 温度参数
+            max_tokens: 最大 token 数
+
+        Returns:
+            模型回复内容
+        """
+        if self.provider == "qwen":
+            # dashscope 无异步接口，放入线程池执行（缓存在同步路径内生效）
+            return await asyncio.to_thread(
+                self.chat_completion, messages, model, temperature, max_tokens
+            )
+
+        cache = _get_response_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = _response_cache_key(
+                self.provider, model or self.model, temperature, max_tokens, messages
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        response = await self.async_client.chat.completions.create(
+            model=model or self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        content = response.choices[0].message.content
+
+        if cache_key is not None:
+            cache.set(cache_key, content)
+        return content
+
+    async def chat_completion_stream_async(
+        self,
+        messages: List[Dict],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ):
+        """
+        chat_completion_stream 的异步版本，逐段产出模型回复
+
+        Args:
+            messages: 消息列表
+            model: 模型名称，None 使用默认模型
+            temperature: 温度参数
+            max_tokens: 最大 token 数
+
+        Yields:
+            模型回复的增量文本片段
+        """
+        if self.provider == "openai":
+            response = await self.async_client.chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        elif self.provider == "qwen":
+            # dashscope 接口不走流式，退化为一次性产出完整回复
+            yield await self.chat_completion_async(
+                messages, model=model, temperature=temperature, max_tokens=max_tokens
+            )
+
+    async def vision_completion_async(
+        self,
+        messages: List[Dict],
+        image_paths: List[str],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        image_urls: Optional[List[str]] = None,
+        pre_encoded_images: Optional[List[str]] = None
+    ) -> str:
+        """
+        vision_completion 的异步版本，供并发调用使用
+
+        Args:
+            messages: 消息列表
+            image_paths: 图片文件路径列表
+            model: 模型名称，None 使用默认模型
+            temperature: 温度参数
+            max_tokens: 最大 token 数
+            image_urls: 远程图片 URL 列表（提供时跳过 base64 内联）
+            pre_encoded_images: 已编码好的 base64 图片列表（JPEG），跳过读盘和编码
+
+        Returns:
+            模型回复内容
+        """
+        if self.provider == "qwen":
+            # dashscope 无异步接口，放入线程池执行（缓存在同步路径内生效）
+            return await asyncio.to_thread(
+                self.vision_completion, messages, image_paths, model, temperature,
+                max_tokens, image_urls, pre_encoded_images
+            )
+
+        cache = _get_response_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = _response_cache_key(
+                self.provider, model or self.model, temperature, max_tokens, messages,
+                _image_cache_parts(image_paths, image_urls, pre_encoded_images)
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if not image_urls and not pre_encoded_images and image_paths:
+            # 磁盘图片改走批量异步读取，不在事件循环里逐张阻塞编码
+            existing = [p for p in image_paths if os.path.exists(p)]
+            if existing:
+                image_urls = [
+                    f"data:image/png;base64,{encoded}"
+                    for encoded in await _encode_images_async(existing)
+                ]
+
+        formatted_messages = self._format_vision_messages(
+            messages, image_paths, image_urls, pre_encoded_images
+        )
+
+        response = await self.async_client.chat.completions.create(
+            model=model or self.model,
+            messages=formatted_messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        content = response.choices[0].message.content
+
+        if cache_key is not None:
+            cache.set(cache_key, content)
+        return content
+
     def analyze_page(
         self,
         page_text: str,
         page_image_path: Optional[str] = None,
-        prompt: Optional[str] = None
+        prompt: Optional[str] = None,
+        page_image_b64: Optional[str] = None
     ) -> str:
         """
         分析 PDF 页面
@@ -216,30 +718,62 @@ class LLMClient:
             page_text: 页面文本内容
             page_image_path: 页面图片路径（可选）
             prompt: 自定义提示词
+            page_image_b64: 已编码好的页面图片 base64（可选，优先于路径）
             
         Returns:
             分析结果
         """
-        default_prompt = """请分析这页论文内容，提取以下信息：
-1. 主要内容概述
-2. 关键概念和技术
-3. 重要数据和结果
-4. 与其他部分的关联
-
-请用中文回答，语言要专业但易懂。"""
-        
-        full_prompt = f"{prompt or default_prompt}\n\n页面文本内容：\n{page_text}"
+        page_text = _truncate_to_token_budget(page_text, settings.MAX_PAGE_TOKENS)
+        full_prompt = f"{prompt or DEFAULT_PAGE_PROMPT}\n\n页面文本内容：\n{page_text}"
         
         messages = [{
             "role": "user",
             "content": full_prompt
         }]
         
-        if page_image_path and os.path.exists(page_image_path):
+        if page_image_b64:
+            return self.vision_completion(messages, [], pre_encoded_images=[page_image_b64])
+        elif page_image_path and os.path.exists(page_image_path):
             return self.vision_completion(messages, [page_image_path])
         else:
             return self.chat_completion(messages)
     
+    async def analyze_page_async(
+        self,
+        page_text: str,
+        page_image_path: Optional[str] = None,
+        prompt: Optional[str] = None,
+        page_image_b64: Optional[str] = None
+    ) -> str:
+        """
+        analyze_page 的异步版本，供逐页并发分析使用
+
+        Args:
+            page_text: 页面文本内容
+            page_image_path: 页面图片路径（可选）
+            prompt: 自定义提示词
+            page_image_b64: 已编码好的页面图片 base64（可选，优先于路径）
+
+        Returns:
+            分析结果
+        """
+        page_text = _truncate_to_token_budget(page_text, settings.MAX_PAGE_TOKENS)
+        full_prompt = f"{prompt or DEFAULT_PAGE_PROMPT}\n\n页面文本内容：\n{page_text}"
+
+        messages = [{
+            "role": "user",
+            "content": full_prompt
+        }]
+
+        if page_image_b64:
+            return await self.vision_completion_async(
+                messages, [], pre_encoded_images=[page_image_b64]
+            )
+        elif page_image_path and os.path.exists(page_image_path):
+            return await self.vision_completion_async(messages, [page_image_path])
+        else:
+            return await self.chat_completion_async(messages)
+
     def translate_text(
         self,
         text: str,
@@ -271,21 +805,58 @@ class LLMClient:
         return self.chat_completion(messages, temperature=0.3)
 
 
+    async def translate_text_async(
+        self,
+        text: str,
+        target_lang: str = "zh",
+        source_lang: Optional[str] = None
+    ) -> str:
+        """
+        translate_text 的异步版本，供批量并发翻译使用
+
+        Args:
+            text: 要翻译的文本
+            target_lang: 目标语言，"zh" 中文，"en" 英文
+            source_lang: 源语言，None 表示自动检测
+
+        Returns:
+            翻译后的文本
+        """
+        lang_map = {"zh": "中文", "en": "英文"}
+        target = lang_map.get(target_lang, "中文")
+
+        prompt = f"请将以下文本翻译成{target}，保持专业术语的准确性，语言流畅自然：\n\n{text}"
+
+        messages = [{
+            "role": "user",
+            "content": prompt
+        }]
+
+        return await self.chat_completion_async(messages, temperature=0.3)
+
+
 class LLMClientFactory:
     """LLM 客户端工厂"""
-    
+
+    # 按提供商缓存客户端实例，各处共用同一个连接池
+    _clients: Dict[str, LLMClient] = {}
+
     @staticmethod
     def create_client(provider: str = "openai") -> LLMClient:
         """
-        创建 LLM 客户端
-        
+        创建（或复用）LLM 客户端
+
         Args:
             provider: 提供商，"openai" 或 "qwen"
-            
+
         Returns:
             LLMClient 实例
         """
-        return LLMClient(provider=provider)
+        client = LLMClientFactory._clients.get(provider)
+        if client is None:
+            client = LLMClient(provider=provider)
+            LLMClientFactory._clients[provider] = client
+        return client
     
     @staticmethod
     def get_default_client() -> LLMClient:
@@ -0,0 +1,38 @@
+"""
+日志配置模块
+通过 QueueHandler + QueueListener 将日志写入移出热路径，
+避免事件循环因同步 stdout 写入（如 Docker 日志管道阻塞）而停顿
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+
+_listener = None
+
+
+def setup_logging(level: int = logging.INFO):
+    """
+    初始化应用日志：主线程只向内存队列投递，
+    实际 I/O 由后台监听线程完成
+
+    Args:
+        level: 日志级别
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s: %(message)s"
+    ))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,47 @@
+"""
+ASGI 中间件
+在请求体被读取之前根据 Content-Length 头拒绝超大上传
+"""
+import logging
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+class ContentSizeLimitMiddleware:
+    """根据 Content-Length 头提前返回 413，省去整个请求体的传输和落盘"""
+
+    def __init__(self, app, max_content_size: int):
+        """
+        初始化中间件
+
+        Args:
+            app: 下游 ASGI 应用
+            max_content_size: 允许的最大请求体字节数
+        """
+        self.app = app
+        self.max_content_size = max_content_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            content_length = None
+            for name, value in scope.get("headers") or []:
+                if name == b"content-length":
+                    try:
+                        content_length = int(value)
+                    except ValueError:
+                        pass
+                    break
+
+            if content_length is not None and content_length > self.max_content_size:
+                logger.warning(
+                    "拒绝超大请求: content-length=%d path=%s",
+                    content_length,
+                    scope.get("path", "")
+                )
+                response = JSONResponse({"detail": "文件过大"}, status_code=413)
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -1,15 +1,64 @@
 """
 论文分析模块
-使用多模态模型逐页分析，提取关键信息并翻译
+使用多模态模型逐页并发分析，提取关键信息并翻译
 """
 import os
-import json
+import asyncio
+
+import orjson
 from typing import Dict, List, Optional
 from paper_whisperer.pdf_processor import PDFProcessor
 from paper_whisperer.llm_client import LLMClientFactory, LLMClient
 from paper_whisperer.config import settings
 
 
+# 提示词模板（模块级常量，长论文逐页调用时免去重复构建多 KB 字符串）
+_PAGE_PROMPT = """请分析这页论文内容（第 {page_num} 页），提取以下信息：
+1. 主要内容概述（2-3句话）
+2. 关键概念和技术术语
+3. 重要数据、图表或结果
+4. 与其他部分的关联
+
+请用中文回答，语言要专业但易懂。如果这一页主要是图表，请描述图表的内容和含义。"""
+
+_KEY_INFO_PROMPT = """请从以下论文内容中提取关键信息，以 JSON 格式返回：
+
+{{
+    "title": "论文标题",
+    "authors": ["作者1", "作者2"],
+    "abstract": "摘要内容",
+    "keywords": ["关键词1", "关键词2"],
+    "main_contributions": ["贡献1", "贡献2"],
+    "methodology": "研究方法概述",
+    "main_results": "主要结果",
+    "conclusions": "结论"
+}}
+
+论文前几页内容：
+{first_pages_text}
+
+请只返回 JSON，不要其他文字。"""
+
+_BATCH_TRANSLATE_PROMPT = """请将下面 JSON 中的每个值翻译成{target}，保持专业术语的准确性，语言流畅自然。
+键保持不变，只翻译值。请只返回 JSON，不要其他文字。
+
+{payload}"""
+
+_SUMMARY_PROMPT = """基于以下信息，生成一篇论文的深度解读摘要（500-800字）：
+
+关键信息：
+标题: {title}
+摘要: {abstract}
+主要贡献: {contributions}
+研究方法: {methodology}
+主要结果: {results}
+
+页面分析：
+{analyses_text}
+
+请用中文撰写，语言要专业但通俗易懂，适合科普文章。"""
+
+
 class PaperAnalyzer:
     """论文分析器"""
     
@@ -23,8 +72,10 @@ class PaperAnalyzer:
         self.pdf_processor = PDFProcessor()
         self.llm_client = LLMClientFactory.create_client(provider=llm_provider)
         self.chunk_size = settings.CHUNK_SIZE
+        # 限制同时在途的 LLM 请求数，避免触发提供商限流
+        self._sem = asyncio.Semaphore(settings.MAX_CONCURRENT_REQUESTS)
     
-    def analyze_paper(
+    async def analyze_paper(
         self,
         pdf_path: str,
         output_dir: Optional[str] = None,
@@ -33,13 +84,13 @@ class PaperAnalyzer:
     ) -> Dict:
         """
         分析整篇论文
-        
+
         Args:
             pdf_path: PDF 文件路径
             output_dir: 输出目录（用于保存临时图片）
             translate: 是否翻译
             target_lang: 目标语言
-            
+
         Returns:
             分析结果字典
         """
@@ -47,54 +98,55 @@ class PaperAnalyzer:
         if output_dir is None:
             output_dir = os.path.join(settings.TEMP_DIR, os.path.basename(pdf_path).replace(".pdf", ""))
         os.makedirs(output_dir, exist_ok=True)
-        
-        # 提取元数据
-        metadata = self.pdf_processor.extract_metadata(pdf_path)
+
+        # 同一个 open() 块内复用已解析的文档：元数据、页数和渲染共享一次解析
+        # （同步解析放入线程池，不阻塞事件循环）
+        def _parse_document():
+            with self.pdf_processor.open(pdf_path):
+                metadata = self.pdf_processor.extract_metadata(pdf_path)
+                if metadata.get("num_pages", 0) == 0:
+                    raise ValueError("无法读取 PDF 文件或文件为空")
+
+                print(f"正在提取文本并转换页面为图片...")
+                text_dict, image_map, blank_pages, b64_map = self.pdf_processor.extract_all(
+                    pdf_path, output_dir
+                )
+                return metadata, text_dict, image_map, blank_pages, b64_map
+
+        metadata, text_dict, image_map, blank_pages, b64_map = await asyncio.to_thread(
+            _parse_document
+        )
         num_pages = metadata.get("num_pages", 0)
-        
-        if num_pages == 0:
-            raise ValueError("无法读取 PDF 文件或文件为空")
-        
-        # 转换页面为图片
-        print(f"正在转换 PDF 页面为图片...")
-        image_paths = self.pdf_processor.convert_to_images(pdf_path, output_dir)
-        
-        # 提取文本
-        print(f"正在提取文本内容...")
-        text_dict = self.pdf_processor.extract_text(pdf_path)
-        
-        # 逐页分析
+
+        # 逐页并发分析：每页都是一次独立的远程 LLM 调用，
+        # 并发度由 MAX_CONCURRENT_REQUESTS 信号量约束
         print(f"正在分析论文内容（共 {num_pages} 页）...")
-        page_analyses = []
-        
+
+        page_tasks = []
         for page_num in range(1, num_pages + 1):
-            print(f"分析第 {page_num}/{num_pages} 页...")
-            
             page_text = text_dict.get(page_num, "")
-            page_image_path = None
-            
-            # 查找对应的图片
-            for img_path in image_paths:
-                if f"page_{page_num}.png" in img_path:
-                    page_image_path = img_path
-                    break
-            
-            # 分析页面
-            analysis = self._analyze_page(page_num, page_text, page_image_path)
-            page_analyses.append(analysis)
-        
+            page_image_path = image_map.get(page_num)
+
+            page_tasks.append(self._analyze_page(
+                page_num, page_text, page_image_path,
+                page_image_b64=b64_map.get(page_num),
+                is_blank=blank_pages.get(page_num, False)
+            ))
+
+        page_analyses = list(await asyncio.gather(*page_tasks))
+
         # 提取关键信息
         print("正在提取关键信息...")
-        key_info = self._extract_key_info(text_dict, page_analyses)
-        
+        key_info = await self._extract_key_info(text_dict, page_analyses)
+
         # 翻译（如果需要）
         if translate:
             print("正在翻译内容...")
-            key_info = self._translate_key_info(key_info, target_lang)
-        
+            key_info = await self._translate_key_info(key_info, target_lang)
+
         # 生成摘要
         print("正在生成论文摘要...")
-        summary = self._generate_summary(key_info, page_analyses)
+        summary = await self._generate_summary(key_info, page_analyses)
         
         result = {
             "metadata": metadata,
@@ -106,37 +158,45 @@ class PaperAnalyzer:
         
         return result
     
-    def _analyze_page(
+    async def _analyze_page(
         self,
         page_num: int,
         page_text: str,
-        page_image_path: Optional[str]
+        page_image_path: Optional[str],
+        page_image_b64: Optional[str] = None,
+        is_blank: bool = False
     ) -> Dict:
         """
         分析单个页面
-        
+
         Args:
             page_num: 页码
             page_text: 页面文本
             page_image_path: 页面图片路径
-            
+            page_image_b64: 渲染阶段预编码的页面图片 base64（优先于路径）
+            is_blank: 渲染阶段标记的空白页（无文本时直接跳过 LLM 调用）
+
         Returns:
             页面分析结果
         """
-        prompt = f"""请分析这页论文内容（第 {page_num} 页），提取以下信息：
-1. 主要内容概述（2-3句话）
-2. 关键概念和技术术语
-3. 重要数据、图表或结果
-4. 与其他部分的关联
+        # 空白/装饰页没有可分析的内容，整次 LLM 调用都省掉
+        if is_blank and not page_text.strip():
+            return {
+                "page_num": page_num,
+                "text": page_text,
+                "analysis": "本页为空白或装饰页"
+            }
 
-请用中文回答，语言要专业但易懂。如果这一页主要是图表，请描述图表的内容和含义。"""
+        prompt = _PAGE_PROMPT.format(page_num=page_num)
         
         try:
-            analysis_text = self.llm_client.analyze_page(
-                page_text=page_text,
-                page_image_path=page_image_path,
-                prompt=prompt
-            )
+            async with self._sem:
+                analysis_text = await self.llm_client.analyze_page_async(
+                    page_text=page_text,
+                    page_image_path=page_image_path,
+                    prompt=prompt,
+                    page_image_b64=page_image_b64
+                )
         except Exception as e:
             analysis_text = f"分析第 {page_num} 页时出错: {str(e)}"
         
@@ -146,7 +206,7 @@ class PaperAnalyzer:
             "analysis": analysis_text
         }
     
-    def _extract_key_info(
+    async def _extract_key_info(
         self,
         text_dict: Dict[int, str],
         page_analyses: List[Dict]
@@ -161,40 +221,26 @@ class PaperAnalyzer:
         Returns:
             关键信息字典
         """
-        # 合并所有页面文本
-        full_text = "\n\n".join([
-            f"--- 第 {page_num} 页 ---\n{text}"
-            for page_num, text in sorted(text_dict.items())
-        ])
+        # 提取前几页（通常是摘要、介绍等），拼满提示词预算即停止
+        pieces = []
+        remaining = 3000
+        for i in range(1, min(4, len(text_dict) + 1)):
+            text = text_dict.get(i, "")
+            if not text:
+                continue
+            pieces.append(text[:remaining])
+            remaining -= len(pieces[-1]) + 2  # 计入连接符
+            if remaining <= 0:
+                break
+        first_pages_text = "\n\n".join(pieces)
         
-        # 提取前几页（通常是摘要、介绍等）
-        first_pages_text = "\n\n".join([
-            text_dict.get(i, "")
-            for i in range(1, min(4, len(text_dict) + 1))
-        ])
-        
-        prompt = f"""请从以下论文内容中提取关键信息，以 JSON 格式返回：
-
-{{
-    "title": "论文标题",
-    "authors": ["作者1", "作者2"],
-    "abstract": "摘要内容",
-    "keywords": ["关键词1", "关键词2"],
-    "main_contributions": ["贡献1", "贡献2"],
-    "methodology": "研究方法概述",
-    "main_results": "主要结果",
-    "conclusions": "结论"
-}}
-
-论文前几页内容：
-{first_pages_text[:3000]}
-
-请只返回 JSON，不要其他文字。"""
+        prompt = _KEY_INFO_PROMPT.format_map({"first_pages_text": first_pages_text})
         
         try:
-            response = self.llm_client.chat_completion([
-                {"role": "user", "content": prompt}
-            ], temperature=0.3)
+            async with self._sem:
+                response = await self.llm_client.chat_completion_async([
+                    {"role": "user", "content": prompt}
+                ], temperature=0.3)
             
             # 尝试解析 JSON
             # 移除可能的 markdown 代码块标记
@@ -207,7 +253,7 @@ class PaperAnalyzer:
                 response = response[:-3]
             response = response.strip()
             
-            key_info = json.loads(response)
+            key_info = orjson.loads(response)
         except Exception as e:
             # 如果解析失败，使用默认结构
             print(f"解析关键信息失败: {e}")
@@ -224,45 +270,103 @@ class PaperAnalyzer:
         
         return key_info
     
-    def _translate_key_info(self, key_info: Dict, target_lang: str) -> Dict:
+    async def _translate_one(self, text: str, target_lang: str, label: str) -> str:
         """
-        翻译关键信息
-        
+        翻译单个字符串，出错时回退原文
+
+        Args:
+            text: 要翻译的文本
+            target_lang: 目标语言
+            label: 出错日志中的字段标识
+
+        Returns:
+            翻译后的文本（失败时为原文）
+        """
+        try:
+            async with self._sem:
+                return await self.llm_client.translate_text_async(text, target_lang)
+        except Exception as e:
+            print(f"翻译 {label} 时出错: {e}")
+            return text
+
+    async def _translate_key_info(self, key_info: Dict, target_lang: str) -> Dict:
+        """
+        翻译关键信息（所有字段和列表项合并为一次批量调用）
+
         Args:
             key_info: 关键信息字典
             target_lang: 目标语言
-            
+
         Returns:
             翻译后的关键信息字典
         """
-        translated = {}
-        
+        # 展平所有需要翻译的叶子节点，统一提交后再按位置还原
+        jobs = []  # (key, index or None)
+        texts = []
+
         for key, value in key_info.items():
             if isinstance(value, str) and value:
-                try:
-                    translated[key] = self.llm_client.translate_text(value, target_lang)
-                except Exception as e:
-                    print(f"翻译 {key} 时出错: {e}")
-                    translated[key] = value
+                jobs.append((key, None))
+                texts.append(value)
             elif isinstance(value, list):
-                translated[key] = []
-                for item in value:
+                for index, item in enumerate(value):
                     if isinstance(item, str) and item:
-                        try:
-                            translated[key].append(
-                                self.llm_client.translate_text(item, target_lang)
-                            )
-                        except Exception as e:
-                            print(f"翻译列表项时出错: {e}")
-                            translated[key].append(item)
-                    else:
-                        translated[key].append(item)
+                        jobs.append((key, index))
+                        texts.append(item)
+
+        if not jobs:
+            return dict(key_info)
+
+        # 所有叶子打包成一个 JSON 发一次请求：N 次往返变 1 次往返
+        lang_map = {"zh": "中文", "en": "英文"}
+        target = lang_map.get(target_lang, "中文")
+        payload = {f"s{i}": text for i, text in enumerate(texts)}
+        prompt = _BATCH_TRANSLATE_PROMPT.format_map({
+            "target": target,
+            "payload": orjson.dumps(payload).decode()
+        })
+
+        try:
+            async with self._sem:
+                response = await self.llm_client.chat_completion_async([
+                    {"role": "user", "content": prompt}
+                ], temperature=0.3)
+
+            # 移除可能的 markdown 代码块标记
+            response = response.strip()
+            if response.startswith("```json"):
+                response = response[7:]
+            if response.startswith("```"):
+                response = response[3:]
+            if response.endswith("```"):
+                response = response[:-3]
+
+            parsed = orjson.loads(response.strip())
+            results = [str(parsed[f"s{i}"]) for i in range(len(texts))]
+        except Exception as e:
+            # 批量结果不可用时回退逐条并发翻译
+            print(f"批量翻译失败，回退逐条翻译: {e}")
+            coros = [
+                self._translate_one(
+                    text, target_lang, key if index is None else f"{key}[{index}]"
+                )
+                for (key, index), text in zip(jobs, texts)
+            ]
+            results = await asyncio.gather(*coros)
+
+        translated = {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in key_info.items()
+        }
+        for (key, index), text in zip(jobs, results):
+            if index is None:
+                translated[key] = text
             else:
-                translated[key] = value
-        
+                translated[key][index] = text
+
         return translated
     
-    def _generate_summary(self, key_info: Dict, page_analyses: List[Dict]) -> str:
+    async def _generate_summary(self, key_info: Dict, page_analyses: List[Dict]) -> str:
         """
         生成论文摘要
         
@@ -279,24 +383,25 @@ class PaperAnalyzer:
             for pa in page_analyses[:10]  # 只取前10页的分析
         ])
         
-        prompt = f"""基于以下信息，生成一篇论文的深度解读摘要（500-800字）：
-
-关键信息：
-标题: {key_info.get('title', '')}
-摘要: {key_info.get('abstract', '')}
-主要贡献: {', '.join(key_info.get('main_contributions', []))}
-研究方法: {key_info.get('methodology', '')}
-主要结果: {key_info.get('main_results', '')}
-
-页面分析：
-{analyses_text[:2000]}
-
-请用中文撰写，语言要专业但通俗易懂，适合科普文章。"""
+        prompt = _SUMMARY_PROMPT.format_map({
+            "title": key_info.get("title", ""),
+            "abstract": key_info.get("abstract", ""),
+            "contributions": ", ".join(key_info.get("main_contributions", [])),
+            "methodology": key_info.get("methodology", ""),
+            "results": key_info.get("main_results", ""),
+            "analyses_text": analyses_text[:2000]
+        })
         
         try:
-            summary = self.llm_client.chat_completion([
-                {"role": "user", "content": prompt}
-            ], temperature=0.7, max_tokens=2000)
+            async with self._sem:
+                # 流式接收：这是全流程中最长的一次生成，逐段累积
+                # 首个 token 到达即可开始处理，而不是等整段生成完
+                pieces = []
+                async for delta in self.llm_client.chat_completion_stream_async([
+                    {"role": "user", "content": prompt}
+                ], temperature=0.7, max_tokens=2000):
+                    pieces.append(delta)
+                summary = "".join(pieces)
         except Exception as e:
             summary = f"生成摘要时出错: {str(e)}"
         
@@ -311,7 +416,8 @@ class PaperAnalyzer:
             output_path: 输出文件路径
         """
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+
+        # orjson 直接产出 UTF-8 字节，二进制写入省掉编码层
+        with open(output_path, "wb") as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
@@ -2,15 +2,137 @@
 PDF 处理模块
 基于 skills/pdf 目录的能力，提取文本、图片和元数据
 """
+import base64
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
-import pdfplumber
 import pypdfium2 as pdfium
-from pdf2image import convert_from_path
 from PIL import Image
 from pypdf import PdfReader
 
+try:
+    # SIMD 加速的 base64 实现，较 stdlib 快 5-20 倍
+    import pybase64
+except ImportError:
+    pybase64 = None
+
+
+# 低于该页数时进程池启动开销不划算，走串行渲染
+_PARALLEL_RENDER_MIN_PAGES = 4
+
+
+def _resize_to_fit(img: Image.Image, max_dim: int) -> Image.Image:
+    """将图片等比缩放到最大边长以内"""
+    width, height = img.size
+    if width > max_dim or height > max_dim:
+        scale_factor = min(max_dim / width, max_dim / height)
+        new_width = int(width * scale_factor)
+        new_height = int(height * scale_factor)
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    return img
+
+
+def _encode_image_b64(img: Image.Image, fmt: str = "JPEG", quality: int = 85) -> str:
+    """把 PIL 图片在内存中编码为 base64（发给多模态模型，JPEG 体积小于 PNG）"""
+    if fmt == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buf = io.BytesIO()
+    img.save(buf, fmt, quality=quality)
+    data = buf.getvalue()
+
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("utf-8")
+
+
+def _is_blank_image(img: Image.Image) -> bool:
+    """判断页面是否近似空白（灰度动态范围过小，如章节分隔页、封底）"""
+    lo, hi = img.convert("L").getextrema()
+    return hi - lo < 10
+
+
+def _native_render_scale(page, max_dim: int) -> float:
+    """
+    根据页面点尺寸计算渲染比例，让 pdfium 直接输出目标分辨率
+
+    相比固定 scale=2.0 渲染后再 Lanczos 缩放，省掉整个重采样遍历
+
+    Args:
+        page: pdfium 页面对象
+        max_dim: 图片最大尺寸（像素）
+
+    Returns:
+        渲染缩放比例（上限 2.0）
+    """
+    width_pt, height_pt = page.get_size()
+    longest = max(width_pt, height_pt) or 1.0
+    return min(2.0, max_dim / longest)
+
+
+def _render_one(pdf_path: str, page_num: int, output_dir: str, max_dim: int) -> str:
+    """
+    渲染单页为 PNG（进程池 worker）
+
+    每个 worker 自行打开文档：pdfium 文档对象不能跨进程共享
+
+    Args:
+        pdf_path: PDF 文件路径
+        page_num: 页码（从1开始）
+        output_dir: 输出目录
+        max_dim: 图片最大尺寸（像素）
+
+    Returns:
+        生成的图片文件路径
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page = pdf[page_num - 1]
+        bitmap = page.render(scale=_native_render_scale(page, max_dim))
+        img = bitmap.to_pil()
+
+        image_path = os.path.join(output_dir, f"page_{page_num}.png")
+        img.save(image_path, "PNG")
+        return image_path
+    finally:
+        pdf.close()
+
+
+def _extract_one(
+    pdf_path: str, page_num: int, output_dir: str, max_dim: int
+) -> Tuple[int, str, str, bool, str]:
+    """
+    单页文本提取 + 渲染（进程池 worker）
+
+    文本和位图在同一次页面遍历中取出，省掉一次完整的文档解析；
+    发给多模态模型的 JPEG base64 也在这里顺手编码，免得后续重渲染
+
+    Args:
+        pdf_path: PDF 文件路径
+        page_num: 页码（从1开始）
+        output_dir: 输出目录
+        max_dim: 图片最大尺寸（像素）
+
+    Returns:
+        (页码, 文本, 图片路径, 是否空白页, JPEG base64) 元组
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page = pdf[page_num - 1]
+        text = page.get_textpage().get_text_range() or ""
+
+        bitmap = page.render(scale=_native_render_scale(page, max_dim))
+        img = bitmap.to_pil()
+
+        image_path = os.path.join(output_dir, f"page_{page_num}.png")
+        img.save(image_path, "PNG")
+        return page_num, text, image_path, _is_blank_image(img), _encode_image_b64(img)
+    finally:
+        pdf.close()
+
 
 class PDFProcessor:
     """PDF 处理器"""
@@ -23,6 +145,51 @@ class PDFProcessor:
             max_dim: 图片最大尺寸（像素）
         """
         self.max_dim = max_dim
+        # open() 上下文内缓存的已解析文档，避免同一文件反复解析
+        self._reader = None
+        self._doc = None
+        self._open_path = None
+
+    @contextmanager
+    def open(self, pdf_path: str):
+        """
+        在 with 块内缓存已解析的文档对象
+
+        元数据、页数、文本和渲染各自打开文件会把同一个 PDF 解析多遍；
+        包在一个 open() 里后，块内的调用复用同一份解析结果
+
+        Args:
+            pdf_path: PDF 文件路径
+
+        Yields:
+            处理器自身（块内直接调用原有方法即可）
+        """
+        self._reader = PdfReader(pdf_path)
+        self._doc = pdfium.PdfDocument(pdf_path)
+        self._open_path = pdf_path
+        try:
+            yield self
+        finally:
+            self._doc.close()
+            self._reader = None
+            self._doc = None
+            self._open_path = None
+
+    def _get_reader(self, pdf_path: str) -> PdfReader:
+        """复用 open() 缓存的 pypdf 解析结果，未打开时临时解析"""
+        if self._reader is not None and pdf_path == self._open_path:
+            return self._reader
+        return PdfReader(pdf_path)
+
+    def _get_total_pages(self, pdf_path: str) -> int:
+        """获取总页数，优先复用 open() 缓存的 pdfium 文档"""
+        if self._doc is not None and pdf_path == self._open_path:
+            return len(self._doc)
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
     
     def extract_metadata(self, pdf_path: str) -> Dict:
         """
@@ -35,7 +202,7 @@ class PDFProcessor:
             包含元数据的字典
         """
         try:
-            reader = PdfReader(pdf_path)
+            reader = self._get_reader(pdf_path)
             metadata = reader.metadata or {}
             
             return {
@@ -61,19 +228,50 @@ class PDFProcessor:
                 "error": str(e)
             }
     
-    def extract_text(self, pdf_path: str, pages: Optional[List[int]] = None) -> Dict[int, str]:
+    def extract_text(
+        self,
+        pdf_path: str,
+        pages: Optional[List[int]] = None,
+        engine: str = "pdfium"
+    ) -> Dict[int, str]:
         """
         提取 PDF 文本内容
         
         Args:
             pdf_path: PDF 文件路径
             pages: 要提取的页码列表（从1开始），None 表示提取所有页
+            engine: 提取引擎，"pdfium"（默认，C++ 实现快一个量级）
+                或 "pdfplumber"（纯 Python，布局分析更细）
             
         Returns:
             字典，键为页码（从1开始），值为文本内容
         """
         text_dict = {}
-        
+
+        if engine == "pdfium":
+            try:
+                # 复用 open() 缓存的文档，未打开时临时解析
+                owned = self._doc is None or pdf_path != self._open_path
+                pdf = pdfium.PdfDocument(pdf_path) if owned else self._doc
+                try:
+                    total_pages = len(pdf)
+                    pages_to_extract = pages if pages else list(range(1, total_pages + 1))
+
+                    for page_num in pages_to_extract:
+                        if 1 <= page_num <= total_pages:
+                            page = pdf[page_num - 1]
+                            text_dict[page_num] = page.get_textpage().get_text_range() or ""
+                finally:
+                    if owned:
+                        pdf.close()
+            except Exception as e:
+                print(f"提取文本时出错: {e}")
+
+            return text_dict
+
+        # 仅在显式要求 pdfplumber 时才导入（纯 Python 包，导入开销可观）
+        import pdfplumber
+
         try:
             with pdfplumber.open(pdf_path) as pdf:
                 total_pages = len(pdf.pages)
@@ -101,7 +299,9 @@ class PDFProcessor:
             字典，键为页码（从1开始），值为表格列表
         """
         tables_dict = {}
-        
+
+        import pdfplumber
+
         try:
             with pdfplumber.open(pdf_path) as pdf:
                 total_pages = len(pdf.pages)
@@ -142,26 +342,32 @@ class PDFProcessor:
         try:
             if use_pypdfium:
                 # 使用 pypdfium2（更快）
-                pdf = pdfium.PdfDocument(pdf_path)
-                total_pages = len(pdf)
-                pages_to_convert = pages if pages else list(range(1, total_pages + 1))
-                
-                for page_num in pages_to_convert:
-                    if 1 <= page_num <= total_pages:
-                        page = pdf[page_num - 1]
-                        bitmap = page.render(scale=2.0)
-                        img = bitmap.to_pil()
-                        
-                        # 缩放图片
-                        img = self._resize_image(img)
-                        
-                        image_path = os.path.join(output_dir, f"page_{page_num}.png")
-                        img.save(image_path, "PNG")
-                        image_paths.append(image_path)
-                
-                pdf.close()
+                total_pages = self._get_total_pages(pdf_path)
+                pages_to_convert = [
+                    page_num
+                    for page_num in (pages if pages else range(1, total_pages + 1))
+                    if 1 <= page_num <= total_pages
+                ]
+
+                if len(pages_to_convert) < _PARALLEL_RENDER_MIN_PAGES:
+                    for page_num in pages_to_convert:
+                        image_paths.append(
+                            _render_one(pdf_path, page_num, output_dir, self.max_dim)
+                        )
+                else:
+                    # 渲染+缩放+PNG 编码为纯 CPU 负载，按页分给进程池近线性加速
+                    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                        futures = [
+                            executor.submit(
+                                _render_one, pdf_path, page_num, output_dir, self.max_dim
+                            )
+                            for page_num in pages_to_convert
+                        ]
+                        image_paths = [future.result() for future in futures]
             else:
-                # 使用 pdf2image（兼容性更好）
+                # 使用 pdf2image（兼容性更好，仅回退路径才导入）
+                from pdf2image import convert_from_path
+
                 images = convert_from_path(pdf_path, dpi=200)
                 total_pages = len(images)
                 pages_to_convert = pages if pages else list(range(1, total_pages + 1))
@@ -192,14 +398,104 @@ class PDFProcessor:
         Returns:
             缩放后的图片
         """
-        width, height = img.size
-        if width > self.max_dim or height > self.max_dim:
-            scale_factor = min(self.max_dim / width, self.max_dim / height)
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        return img
+        return _resize_to_fit(img, self.max_dim)
     
+    def render_page_to_b64(
+        self,
+        pdf_path: str,
+        page_num: int,
+        fmt: str = "JPEG",
+        quality: int = 85
+    ) -> str:
+        """
+        渲染单页并直接编码为 base64，不落盘
+
+        图片只发给多模态模型时，省掉 PNG 压缩和两次磁盘往返；
+        JPEG 体积更小，请求 payload 也随之缩减
+
+        Args:
+            pdf_path: PDF 文件路径
+            page_num: 页码（从1开始）
+            fmt: 图片编码格式
+            quality: JPEG 压缩质量
+
+        Returns:
+            base64 编码的图片字符串
+        """
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            page = pdf[page_num - 1]
+            img = page.render(scale=_native_render_scale(page, self.max_dim)).to_pil()
+        finally:
+            pdf.close()
+
+        return _encode_image_b64(img, fmt, quality)
+
+    def extract_all(
+        self,
+        pdf_path: str,
+        output_dir: str,
+        pages: Optional[List[int]] = None
+    ) -> Tuple[Dict[int, str], Dict[int, str], Dict[int, bool], Dict[int, str]]:
+        """
+        一次打开 PDF 同时提取文本并渲染图片
+
+        相比先 extract_text 再 convert_to_images，文件结构只解析一遍
+
+        Args:
+            pdf_path: PDF 文件路径
+            output_dir: 图片输出目录
+            pages: 要处理的页码列表（从1开始），None 表示处理所有页
+
+        Returns:
+            (文本字典, 图片路径字典, 空白页标记字典, JPEG base64 字典) 元组，
+            键均为页码（从1开始）
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        text_dict = {}
+        image_map = {}
+        blank_pages = {}
+        b64_map = {}
+
+        try:
+            total_pages = self._get_total_pages(pdf_path)
+            pages_to_process = [
+                page_num
+                for page_num in (pages if pages else range(1, total_pages + 1))
+                if 1 <= page_num <= total_pages
+            ]
+
+            if len(pages_to_process) < _PARALLEL_RENDER_MIN_PAGES:
+                results = [
+                    _extract_one(pdf_path, page_num, output_dir, self.max_dim)
+                    for page_num in pages_to_process
+                ]
+            else:
+                with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                    futures = [
+                        executor.submit(
+                            _extract_one, pdf_path, page_num, output_dir, self.max_dim
+                        )
+                        for page_num in pages_to_process
+                    ]
+                    results = [future.result() for future in futures]
+
+            for page_num, text, image_path, is_blank, image_b64 in results:
+                text_dict[page_num] = text
+                image_map[page_num] = image_path
+                blank_pages[page_num] = is_blank
+                b64_map[page_num] = image_b64
+        except Exception as e:
+            print(f"解析 PDF 时出错: {e}")
+
+        # pdfium 提取不到任何文本时回退 pdfplumber（处理个别编码特殊的文件）
+        if not any(text_dict.values()):
+            fallback = self.extract_text(pdf_path, pages=pages, engine="pdfplumber")
+            if any(fallback.values()):
+                text_dict = fallback
+
+        return text_dict, image_map, blank_pages, b64_map
+
     def get_page_count(self, pdf_path: str) -> int:
         """
         获取 PDF 页数
@@ -211,8 +507,7 @@ class PDFProcessor:
             页数
         """
         try:
-            reader = PdfReader(pdf_path)
-            return len(reader.pages)
+            return len(self._get_reader(pdf_path).pages)
         except Exception:
             return 0
     
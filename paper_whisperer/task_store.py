@@ -0,0 +1,198 @@
+"""
+任务状态存储模块
+配置了 REDIS_URL 时使用 Redis 哈希存储（可跨 worker 共享、重启不丢失），
+否则回退到进程内字典（仅适用于单 worker 开发环境）
+"""
+import json
+from typing import Dict, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+from paper_whisperer.config import settings
+
+
+# 论文处理任务队列的 Redis 键名
+QUEUE_KEY = "pw:queue"
+
+
+class TaskStore:
+    """任务状态存储，优先 Redis，未配置时回退进程内字典"""
+
+    def __init__(self):
+        """初始化存储后端"""
+        self._redis = None
+        self._local: Dict[str, Dict] = {}
+        self._local_analysis: Dict[str, Dict] = {}
+
+        if aioredis is not None and settings.REDIS_URL:
+            self._redis = aioredis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True
+            )
+
+    @staticmethod
+    def _key(task_id: str) -> str:
+        """生成任务的 Redis 键名"""
+        return f"task:{task_id}"
+
+    @staticmethod
+    def _encode(fields: Dict) -> Dict:
+        """将任务字段编码为可写入 Redis 哈希的字符串映射"""
+        encoded = {}
+        for key, value in fields.items():
+            if key == "result":
+                encoded[key] = json.dumps(value, ensure_ascii=False) if value is not None else ""
+            else:
+                encoded[key] = str(value)
+        return encoded
+
+    @staticmethod
+    def _decode(data: Dict) -> Dict:
+        """将 Redis 哈希字段还原为任务状态字典"""
+        result = data.get("result") or None
+        if result:
+            result = json.loads(result)
+        decoded = {
+            "status": data.get("status", ""),
+            "progress": float(data.get("progress", 0)),
+            "message": data.get("message", ""),
+            "result": result
+        }
+        if "digest" in data:
+            decoded["digest"] = data["digest"]
+        return decoded
+
+    async def update(self, task_id: str, **fields):
+        """
+        更新任务的部分字段
+
+        Args:
+            task_id: 任务 ID
+            **fields: 要更新的字段（status/progress/message/result）
+        """
+        if self._redis is not None:
+            # 所有字段和 TTL 合并为一次 pipeline 往返写入
+            key = self._key(task_id)
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping=self._encode(fields))
+                pipe.expire(key, settings.TASK_TTL)
+                await pipe.execute()
+        else:
+            self._local.setdefault(task_id, {
+                "status": "",
+                "progress": 0,
+                "message": "",
+                "result": None
+            }).update(fields)
+
+    async def get(self, task_id: str) -> Optional[Dict]:
+        """
+        获取任务状态
+
+        Args:
+            task_id: 任务 ID
+
+        Returns:
+            任务状态字典，任务不存在时返回 None
+        """
+        if self._redis is not None:
+            data = await self._redis.hgetall(self._key(task_id))
+            if not data:
+                return None
+            return self._decode(data)
+        return self._local.get(task_id)
+
+    @property
+    def has_redis(self) -> bool:
+        """是否启用了 Redis 后端"""
+        return self._redis is not None
+
+    async def push_job(self, payload: Dict):
+        """
+        将处理任务投递到 Redis 队列
+
+        Args:
+            payload: 任务参数字典（task_id、pdf_path 及处理选项）
+        """
+        await self._redis.rpush(QUEUE_KEY, json.dumps(payload, ensure_ascii=False))
+
+    async def pop_job(self, timeout: int = 5) -> Optional[Dict]:
+        """
+        从 Redis 队列阻塞取出一个处理任务
+
+        Args:
+            timeout: 阻塞等待时间（秒）
+
+        Returns:
+            任务参数字典，超时返回 None
+        """
+        item = await self._redis.blpop(QUEUE_KEY, timeout=timeout)
+        if item is None:
+            return None
+        return json.loads(item[1])
+
+    @staticmethod
+    def _analysis_key(digest: str, translate: bool, target_lang: str) -> str:
+        """分析缓存键：同一 PDF 配不同翻译选项时结果不同，选项必须参与键"""
+        return f"pw:analysis:{digest}:{int(translate)}:{target_lang}"
+
+    async def get_cached_analysis(
+        self, digest: str, translate: bool, target_lang: str
+    ) -> Optional[Dict]:
+        """
+        按 PDF 内容哈希和分析选项查询已缓存的分析结果
+
+        Args:
+            digest: PDF 内容哈希
+            translate: 是否翻译
+            target_lang: 目标语言
+
+        Returns:
+            分析结果字典，未命中返回 None
+        """
+        key = self._analysis_key(digest, translate, target_lang)
+        if self._redis is not None:
+            cached = await self._redis.get(key)
+            if cached is None:
+                return None
+            return json.loads(cached)
+        return self._local_analysis.get(key)
+
+    async def set_cached_analysis(
+        self, digest: str, translate: bool, target_lang: str, analysis: Dict
+    ):
+        """
+        按 PDF 内容哈希和分析选项缓存分析结果
+
+        Args:
+            digest: PDF 内容哈希
+            translate: 是否翻译
+            target_lang: 目标语言
+            analysis: 分析结果字典
+        """
+        key = self._analysis_key(digest, translate, target_lang)
+        if self._redis is not None:
+            await self._redis.setex(
+                key,
+                settings.ANALYSIS_CACHE_TTL,
+                json.dumps(analysis, ensure_ascii=False)
+            )
+        else:
+            self._local_analysis[key] = analysis
+
+    async def exists(self, task_id: str) -> bool:
+        """
+        检查任务是否存在
+
+        Args:
+            task_id: 任务 ID
+
+        Returns:
+            任务是否存在
+        """
+        if self._redis is not None:
+            return bool(await self._redis.exists(self._key(task_id)))
+        return task_id in self._local
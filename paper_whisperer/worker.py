@@ -0,0 +1,34 @@
+"""
+论文处理 worker 进程
+从 Redis 队列阻塞取出任务并执行 process_paper_task，
+与 Web 进程解耦，可启动多个实例独立扩容
+
+启动方式：python -m paper_whisperer.worker
+"""
+import asyncio
+
+from paper_whisperer.task_store import TaskStore
+
+
+async def run_worker():
+    """worker 主循环：阻塞取任务并执行"""
+    # 延迟导入，避免 worker 启动时加载整个 Web 应用才发现 Redis 未配置
+    store = TaskStore()
+    if not store.has_redis:
+        raise RuntimeError("worker 需要配置 REDIS_URL（见 config.py）")
+
+    from paper_whisperer.app import process_paper_task
+
+    print("worker 已启动，等待任务...")
+    while True:
+        job = await store.pop_job()
+        if job is None:
+            continue
+        try:
+            await process_paper_task(**job)
+        except Exception as e:
+            print(f"执行任务出错: {e}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -8,6 +8,8 @@ if __name__ == "__main__":
         "paper_whisperer.app:app",
         host="0.0.0.0",
         port=8020,
-        reload=True
+        reload=True,
+        loop="uvloop",
+        http="httptools"
     )
 